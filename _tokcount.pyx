@@ -0,0 +1,48 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled NAME-dispatch loop for keyword_analytics._count_tokens.
+Build in place with:  cythonize -3 -i _tokcount.pyx
+keyword_analytics falls back to its pure-Python loop when this isn't built.
+"""
+
+from cpython.dict cimport PyDict_GetItem, PyDict_SetItem
+from cpython.ref cimport PyObject
+
+from tokenize import NAME, TokenError
+
+cdef long NAME_TYPE = NAME
+
+
+def count_names(tokens, dict name_kind, kw_counter, bi_counter, dn_counter):
+    """
+    Same contract as keyword_analytics._count_tokens: count names in
+    name_kind into the counters (0 keyword / 1 built-in / 2 dunder), stop
+    quietly on tokenizer errors (TokenError / SyntaxError), return the number
+    of NAME tokens seen.
+    Counters may be any dict subclass (collections.Counter).
+    """
+    cdef Py_ssize_t n_names = 0
+    cdef tuple tok
+    cdef object s
+    cdef PyObject* kind
+    cdef PyObject* cur
+    cdef dict counter
+    cdef long k
+    try:
+        for t in tokens:
+            tok = <tuple>t
+            if <long>tok[0] != NAME_TYPE:
+                continue
+            n_names += 1
+            s = tok[1]
+            kind = PyDict_GetItem(name_kind, s)
+            if kind is NULL:
+                continue
+            k = <long><object>kind
+            counter = <dict>(kw_counter if k == 0 else bi_counter if k == 1 else dn_counter)
+            # Counter's __missing__ isn't reachable through PyDict_GetItem.
+            cur = PyDict_GetItem(counter, s)
+            PyDict_SetItem(counter, s, 1 if cur is NULL else <object>cur + 1)
+    except (TokenError, SyntaxError):
+        pass
+    return n_names
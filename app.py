@@ -4,13 +4,16 @@ keyword/builtin/dunder analytics, return JSON for the frontend to display.
 Results are cached by normalized repo URL so repeat requests are instant.
 """
 
+import gzip
 import hashlib
-import json
 import os
 import subprocess
+import tempfile
+import zlib
 from pathlib import Path
 
-from flask import Flask, jsonify, render_template_string, request
+import orjson
+from flask import Flask, Response, jsonify, request
 
 from keyword_analytics import _normalize_repo_url, run_workflow_repo
 
@@ -20,6 +23,8 @@ app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = 1024
 
 CACHE_DIR = Path(__file__).resolve().parent / ".analytics_cache"
+# Browser cache lifetime (seconds) for /analyze results
+CACHE_MAX_AGE = 3600
 INDEX_HTML = open(os.path.join(os.path.dirname(__file__), "templates", "index.html")).read()
 
 
@@ -29,31 +34,78 @@ def _cache_key(repo: str) -> str:
     return hashlib.sha256(url.encode()).hexdigest()[:24]
 
 
+def _write_cache(cache_path: Path, body: bytes) -> None:
+    """
+    Write gzip'd cache entry via temp file + rename so readers never see a
+    partial body. Level 1: these frequency dicts compress well even at the
+    cheapest setting.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(gzip.compress(body, compresslevel=1, mtime=0))
+        os.replace(tmp, cache_path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _cached_response(cache_path: Path) -> Response:
+    """
+    Serve a cache entry. Clients accepting gzip get the stored bytes as-is
+    (Content-Encoding: gzip); others get them inflated. The entry is always
+    inflated once, so a truncated or corrupt one raises (OSError, EOFError or
+    zlib.error) rather than being served. The ETag is a hash of the stored
+    bytes, so it changes whenever the entry is recomputed; with
+    Last-Modified / Cache-Control, GET revalidation answers 304 with no body.
+    """
+    body = cache_path.read_bytes()
+    inflated = gzip.decompress(body)  # checks the gzip CRC and length trailer
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    if request.accept_encodings["gzip"]:
+        resp = Response(body, mimetype="application/json")
+        resp.headers["Content-Encoding"] = "gzip"
+        resp.set_etag(f"{etag}-gzip")
+    else:
+        resp = Response(inflated, mimetype="application/json")
+        resp.set_etag(etag)
+    resp.last_modified = cache_path.stat().st_mtime
+    resp.cache_control.public = True
+    resp.cache_control.max_age = CACHE_MAX_AGE
+    resp.vary.add("Accept-Encoding")
+    return resp.make_conditional(request)
+
+
 @app.route("/")
 def index():
-    return render_template_string(INDEX_HTML)
+    # Static page (no Jinja variables): serve as-is, no template parse per hit.
+    return Response(INDEX_HTML, mimetype="text/html")
 
 
-@app.route("/analyze", methods=["POST"])
+@app.route("/analyze", methods=["GET", "POST"])
 def analyze():
-    data = request.get_json(force=True, silent=True) or {}
-    repo = (data.get("repo") or "").strip()
+    # GET /analyze?repo=... is cacheable/revalidatable by browsers; POST kept for API clients.
+    if request.method != "POST":  # GET, or HEAD via GET
+        repo = (request.args.get("repo") or "").strip()
+    else:
+        data = request.get_json(force=True, silent=True) or {}
+        repo = (data.get("repo") or "").strip()
     if not repo:
         return jsonify({"error": "Missing 'repo'. Send e.g. { \"repo\": \"django/django\" }"}), 400
     key = _cache_key(repo)
-    cache_path = CACHE_DIR / f"{key}.json"
+    cache_path = CACHE_DIR / f"{key}.json.gz"
+    # Cache holds the exact (gzip'd) response body, served without re-encoding.
     if cache_path.exists():
         try:
-            with open(cache_path) as f:
-                return jsonify(json.load(f))
-        except (json.JSONDecodeError, OSError):
+            return _cached_response(cache_path)
+        except (OSError, EOFError, zlib.error):
+            # Unreadable or corrupt entry: drop it and recompute
             cache_path.unlink(missing_ok=True)
     try:
         result = run_workflow_repo(repo, timeout_seconds=90, max_files=30_000)
-        CACHE_DIR.mkdir(parents=True, exist_ok=True)
-        with open(cache_path, "w") as f:
-            json.dump(result, f, indent=2)
-        return jsonify(result)
+        _write_cache(cache_path, orjson.dumps(result))
+        return _cached_response(cache_path)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except subprocess.TimeoutExpired:
@@ -63,4 +115,6 @@ def analyze():
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5001, debug=False)
+    from waitress import serve
+
+    serve(app, host="0.0.0.0", port=5001, threads=8)
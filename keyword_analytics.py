@@ -6,20 +6,48 @@ Language reference frozen at Python 3.12 (see py312_language.py).
 Supports single URL, in-memory source, or full python/cpython repo (all .py files).
 """
 
+import hashlib
 import io
 import json
+import mmap
+import multiprocessing
+import os
 import re
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
 import tokenize
 import urllib.request
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional, Union
 
 from py312_language import PY312_BUILTINS, PY312_KEYWORDS, PY312_SPECIAL_METHODS
 
+try:  # compiled NAME-dispatch loop, built with: cythonize -3 -i _tokcount.pyx
+    from _tokcount import count_names as _count_names_compiled
+except ImportError:
+    _count_names_compiled = None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Raw file contents: bytes, or a read-only mmap for large files
+Buffer = Union[bytes, mmap.mmap]
+
+# NAME token -> 0 keyword / 1 built-in / 2 dunder, so the hot loop classifies
+# each name with one dict lookup. Built-ins and dunders are disjoint; keywords
+# go in last so True/False/None/type count as keywords, not built-ins.
+_NAME_KIND = dict.fromkeys(PY312_BUILTINS, 1)
+_NAME_KIND.update(dict.fromkeys(PY312_SPECIAL_METHODS, 2))
+_NAME_KIND.update(dict.fromkeys(PY312_KEYWORDS, 0))
+
 
 def fetch_corpus_into_ram(url: str) -> str:
     """Fetch raw text from URL into memory (RAM); return as string."""
@@ -27,44 +55,39 @@ def fetch_corpus_into_ram(url: str) -> str:
         return resp.read().decode("utf-8", errors="replace")
 
 
-def tokenize_source(source: str) -> list[tuple[str, str]]:
+def _count_tokens(
+    tokens: Iterable[tokenize.TokenInfo],
+    kw_counter: Counter,
+    bi_counter: Counter,
+    dn_counter: Counter,
+) -> int:
     """
-    Tokenize Python source (in RAM). Returns list of (kind, string) where
-    kind is 'keyword' or 'name'. Uses Python 3.12 keyword set.
+    Consume a tokenize stream and count keyword, built-in, and dunder method
+    names straight into the given Counters, in a single pass.
+    Uses Python 3.12 frozen language reference. Returns number of NAME tokens.
+    Tokenizer errors (TokenError, IndentationError, ...) end the stream
+    quietly, keeping the counts seen so far.
+    Runs the compiled _tokcount loop when available.
     """
-    tokens = []
+    if _count_names_compiled is not None:
+        return _count_names_compiled(tokens, _NAME_KIND, kw_counter, bi_counter, dn_counter)
+    name_type = tokenize.NAME
+    kind_of = _NAME_KIND.get
+    counters = (kw_counter, bi_counter, dn_counter)
+    n_names = 0
     try:
-        for tok in tokenize.generate_tokens(io.StringIO(source).readline):
-            if tok.type != tokenize.NAME:
+        # TokenInfo is a namedtuple: unpack positionally instead of paying
+        # for .type/.string attribute lookups on every token.
+        for ttype, s, *_ in tokens:
+            if ttype != name_type:
                 continue
-            if tok.string in PY312_KEYWORDS:
-                tokens.append(("keyword", tok.string))
-            else:
-                tokens.append(("name", tok.string))
-    except tokenize.TokenError:
+            n_names += 1
+            kind = kind_of(s)
+            if kind is not None:
+                counters[kind][s] += 1
+    except (tokenize.TokenError, SyntaxError):
         pass
-    return tokens
-
-
-def count_keywords_builtins_dunder(
-    tokens: list[tuple[str, str]],
-) -> tuple[Counter, Counter, Counter]:
-    """
-    Count keyword, built-in, and dunder method frequency from token list.
-    Uses Python 3.12 frozen language reference.
-    """
-    keyword_counts: Counter = Counter()
-    builtin_counts: Counter = Counter()
-    dunder_counts: Counter = Counter()
-    for kind, s in tokens:
-        if kind == "keyword":
-            keyword_counts[s] += 1
-        elif kind == "name":
-            if s in PY312_BUILTINS:
-                builtin_counts[s] += 1
-            if s in PY312_SPECIAL_METHODS:
-                dunder_counts[s] += 1
-    return keyword_counts, builtin_counts, dunder_counts
+    return n_names
 
 
 def run_workflow(
@@ -84,21 +107,22 @@ def run_workflow(
     else:
         raise ValueError("Provide either corpus_url or in_memory_source")
 
-    tokens = tokenize_source(source)
-    keyword_freq, builtin_freq, dunder_freq = count_keywords_builtins_dunder(tokens)
+    keyword_freq: Counter = Counter()
+    builtin_freq: Counter = Counter()
+    dunder_freq: Counter = Counter()
+    tokens = tokenize.generate_tokens(io.StringIO(source).readline)
+    total_tokens = _count_tokens(tokens, keyword_freq, builtin_freq, dunder_freq)
 
     return {
         "meta": {
             "source": source_note,
             "language_reference": "Python 3.12 (frozen)",
-            "total_tokens_analyzed": len(tokens),
+            "total_tokens_analyzed": total_tokens,
             "total_keyword_occurrences": sum(keyword_freq.values()),
             "total_builtin_occurrences": sum(builtin_freq.values()),
             "total_dunder_occurrences": sum(dunder_freq.values()),
         },
-        "keyword_freq": dict(keyword_freq.most_common()),
-        "builtin_freq": dict(builtin_freq.most_common()),
-        "dunder_freq": dict(dunder_freq.most_common()),
+        **_freq_fields(keyword_freq, builtin_freq, dunder_freq),
     }
 
 
@@ -108,31 +132,218 @@ def save_analytics(result: dict, path: str = "keyword_analytics.json") -> None:
         json.dump(result, f, indent=2)
 
 
-def _run_workflow_directory(repo_root: Path, source_label: str) -> dict:
+def _iter_py_files(root: Path) -> Iterator[tuple[str, int]]:
+    """
+    Yield (path, size in bytes) of all .py files under root via os.scandir.
+    DirEntry.is_dir/is_file reuse the d_type from the directory listing and
+    the size comes from DirEntry.stat, cached on the entry; symlinks are not
+    followed.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".py") and entry.is_file(follow_symlinks=False):
+                    try:
+                        size = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+                    yield entry.path, size
+
+
+def _file_cache_path(data: Buffer) -> Path:
+    """Sidecar cache path for a file's counts, keyed by a hash of its content."""
+    digest = hashlib.blake2b(data, digest_size=16, person=FILE_CACHE_SALT).hexdigest()
+    return FILE_CACHE_DIR / digest[:2] / f"{digest}.json"
+
+
+def _bytes_readline(data: Buffer) -> Callable[[], bytes]:
+    """readline over data from its start (rewinds an mmap)."""
+    if isinstance(data, mmap.mmap):
+        data.seek(0)
+        return data.readline
+    return io.BytesIO(data).readline
+
+
+def _count_data(data: Buffer, use_file_cache: bool = False) -> tuple[int, int, dict, dict, dict]:
+    """
+    Tokenize and count one file's raw bytes (bytes or a read-only mmap).
+    With use_file_cache, go through the on-disk content-hash cache.
+    """
+    if use_file_cache:
+        cache_path = _file_cache_path(data)
+        try:
+            with open(cache_path, "rb") as f:
+                cached = json.load(f)
+            return len(data), cached["tokens"], cached["keyword"], cached["builtin"], cached["dunder"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    kw: Counter = Counter()
+    blt: Counter = Counter()
+    dnd: Counter = Counter()
+    # tokenize.tokenize reads bytes lines directly (honouring BOM / coding
+    # cookies), so the file is never decoded into one big str up front.
+    try:
+        # Checked up front: inside the token stream, _count_tokens would
+        # swallow detect_encoding's SyntaxError as a tokenizer error.
+        tokenize.detect_encoding(_bytes_readline(data))
+        n_tokens = _count_tokens(tokenize.tokenize(_bytes_readline(data)), kw, blt, dnd)
+    except (SyntaxError, UnicodeDecodeError):
+        # Bad coding cookie, or not decodable as declared: fall back to
+        # lossy UTF-8 text.
+        kw.clear()
+        blt.clear()
+        dnd.clear()
+        source = data[:].decode("utf-8", errors="replace")
+        tokens = tokenize.generate_tokens(io.StringIO(source).readline)
+        n_tokens = _count_tokens(tokens, kw, blt, dnd)
+    entry = {"tokens": n_tokens, "keyword": dict(kw), "builtin": dict(blt), "dunder": dict(dnd)}
+    if use_file_cache:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so concurrent workers never see a partial entry.
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+    return len(data), n_tokens, entry["keyword"], entry["builtin"], entry["dunder"]
+
+
+def _count_file(path: str, use_file_cache: bool = False) -> Optional[tuple[int, int, dict, dict, dict]]:
+    """
+    Process-pool worker: read one .py file, tokenize and count it.
+    Files above MMAP_MIN_BYTES are mapped rather than read, so hashing and
+    tokenizing work on the page cache without copying the file into the heap.
+    Returns (bytes, tokens, keyword, builtin, dunder) with plain dicts (cheaper
+    to pickle back than Counters), or None if the file can't be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size > MMAP_MIN_BYTES:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return _count_data(mm, use_file_cache)
+            data = f.read()
+    except (OSError, ValueError):
+        return None
+    return _count_data(data, use_file_cache)
+
+
+def _merge_counts(dst: dict[str, int], src: dict[str, int]) -> None:
+    """Add src counts into dst in place (plain-dict Counter.update)."""
+    get = dst.get
+    for k, v in src.items():
+        dst[k] = get(k, 0) + v
+
+
+def _by_frequency(counts: dict[str, int]) -> dict[str, int]:
+    """Counts ordered most common first, same order as Counter.most_common()."""
+    return dict(sorted(counts.items(), key=itemgetter(1), reverse=True))
+
+
+def _freq_fields(keyword: dict[str, int], builtin: dict[str, int], dunder: dict[str, int]) -> dict:
+    """Result frequency fields: keyword/builtin/dunder_freq, most common first."""
+    return {
+        "keyword_freq": _by_frequency(keyword),
+        "builtin_freq": _by_frequency(builtin),
+        "dunder_freq": _by_frequency(dunder),
+    }
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by all directory runs, created on first use. One pool
+    caps concurrent analyses (e.g. the web app's request threads) at
+    cpu_count workers in total; workers come from a forkserver (spawn where
+    unavailable) so the possibly multi-threaded caller is never forked.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            ctx = multiprocessing.get_context(method)
+            if method == "forkserver":
+                ctx.set_forkserver_preload([__name__])
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=ctx)
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Drop a broken pool (a worker was killed) so the next _get_pool() starts a
+    fresh one. Only clears _pool if another thread hasn't replaced it already.
     """
-    Walk all .py files under repo_root, tokenize, aggregate keyword/builtin/dunder.
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_workflow_directory(
+    py_files: list[tuple[str, int]],
+    source_label: str,
+    use_file_cache: bool = False,
+) -> dict:
+    """
+    Tokenize the given .py files ((path, size) pairs from _iter_py_files) and
+    aggregate keyword/builtin/dunder.
+    use_file_cache reuses per-file counts from FILE_CACHE_DIR across runs; only
+    worth it for trees re-analysed as they change (the local cpython clone).
+    Empty files are counted without being read; files over MAX_FILE_BYTES
+    (generated tables, protobufs) are skipped and reported in meta.
+    Files are independent, so they are tokenized across the shared process
+    pool (the tokenizer holds the GIL; threads wouldn't help); runs below
+    POOL_MIN_FILES are counted inline, where pool IPC would cost more. If a
+    worker dies mid-run the pool is replaced and the run retried once.
     Shared by run_workflow_cpython and run_workflow_repo.
     """
-    keyword_totals: Counter = Counter()
-    builtin_totals: Counter = Counter()
-    dunder_totals: Counter = Counter()
+    keyword_totals: dict[str, int] = {}
+    builtin_totals: dict[str, int] = {}
+    dunder_totals: dict[str, int] = {}
     total_tokens = 0
     files_processed = 0
     total_bytes = 0
-
-    py_files = sorted(repo_root.rglob("*.py"))
-    for path in py_files:
+    files_skipped = 0
+    bytes_skipped = 0
+
+    to_count = []
+    for path, size in sorted(py_files):
+        if size == 0:
+            files_processed += 1
+        elif size > MAX_FILE_BYTES:
+            files_skipped += 1
+            bytes_skipped += size
+        else:
+            to_count.append(path)
+    count_file = partial(_count_file, use_file_cache=use_file_cache)
+    if len(to_count) < POOL_MIN_FILES:
+        results = map(count_file, to_count)
+    else:
+        # Collected before merging, so a retry never double-counts.
+        pool = _get_pool()
         try:
-            source = path.read_text(encoding="utf-8", errors="replace")
-        except OSError:
+            results = list(pool.map(count_file, to_count, chunksize=64))
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            results = list(_get_pool().map(count_file, to_count, chunksize=64))
+    for counted in results:
+        if counted is None:
             continue
-        total_bytes += len(source.encode("utf-8", errors="replace"))
-        tokens = tokenize_source(source)
-        kw, blt, dnd = count_keywords_builtins_dunder(tokens)
-        keyword_totals.update(kw)
-        builtin_totals.update(blt)
-        dunder_totals.update(dnd)
-        total_tokens += len(tokens)
+        n_bytes, n_tokens, kw, blt, dnd = counted
+        _merge_counts(keyword_totals, kw)
+        _merge_counts(builtin_totals, blt)
+        _merge_counts(dunder_totals, dnd)
+        total_bytes += n_bytes
+        total_tokens += n_tokens
         files_processed += 1
 
     return {
@@ -145,10 +356,10 @@ def _run_workflow_directory(repo_root: Path, source_label: str) -> dict:
             "total_builtin_occurrences": sum(builtin_totals.values()),
             "total_dunder_occurrences": sum(dunder_totals.values()),
             "total_bytes": total_bytes,
+            "files_skipped": files_skipped,
+            "bytes_skipped": bytes_skipped,
         },
-        "keyword_freq": dict(keyword_totals.most_common()),
-        "builtin_freq": dict(builtin_totals.most_common()),
-        "dunder_freq": dict(dunder_totals.most_common()),
+        **_freq_fields(keyword_totals, builtin_totals, dunder_totals),
     }
 
 
@@ -162,9 +373,32 @@ def _normalize_repo_url(repo_input: str) -> str:
     return s
 
 
+def _clone_py_only(
+    url: str,
+    repo_path: Path,
+    branch: Optional[str] = None,
+    timeout_seconds: Optional[float] = None,
+) -> None:
+    """
+    Shallow, blobless clone of url into repo_path with a sparse checkout of
+    *.py only, so non-Python blobs (docs, images, C sources) are never fetched.
+    timeout_seconds bounds the whole clone + checkout, not each git call.
+    """
+    deadline = None if timeout_seconds is None else time.monotonic() + timeout_seconds
+
+    def git(*args: str) -> None:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0.001)
+        subprocess.run(["git", *args], check=True, capture_output=True, timeout=timeout)
+
+    branch_args = ["--branch", branch] if branch else []
+    git("clone", "--depth", "1", "--filter=blob:none", "--no-checkout", *branch_args, url, str(repo_path))
+    git("-C", str(repo_path), "sparse-checkout", "set", "--no-cone", "*.py")
+    git("-C", str(repo_path), "checkout")
+
+
 def clone_repo(repo_url: str, target_dir: Path, timeout_seconds: int = 120) -> Path:
     """
-    Clone repo (shallow) into target_dir. Returns path to repo root.
+    Clone repo (shallow, .py files only) into target_dir. Returns path to repo root.
     target_dir must exist; clone creates target_dir / repo_name.
     """
     url = _normalize_repo_url(repo_url)
@@ -173,12 +407,7 @@ def clone_repo(repo_url: str, target_dir: Path, timeout_seconds: int = 120) -> P
     repo_path = target_dir / name
     if repo_path.exists():
         shutil.rmtree(repo_path)
-    subprocess.run(
-        ["git", "clone", "--depth", "1", url, str(repo_path)],
-        check=True,
-        capture_output=True,
-        timeout=timeout_seconds,
-    )
+    _clone_py_only(url, repo_path, timeout_seconds=timeout_seconds)
     return repo_path
 
 
@@ -195,19 +424,20 @@ def run_workflow_repo(repo_url: str, timeout_seconds: int = 120, max_files: int
         if not children:
             raise ValueError("Clone produced no directory")
         repo_root = children[0]
-        py_count = len(list(repo_root.rglob("*.py")))
+        py_files = list(_iter_py_files(repo_root))
+        py_count = len(py_files)
         if py_count == 0:
             raise ValueError("Repository contains no .py files")
         if py_count > max_files:
             raise ValueError(f"Repository has {py_count} .py files; max allowed is {max_files}")
-        result = _run_workflow_directory(repo_root, repo_url)
+        result = _run_workflow_directory(py_files, repo_url)
         result["meta"]["repo_url"] = repo_url
         return result
 
 
 def ensure_cpython_repo(target_dir: Path, clone_url: str = "https://github.com/python/cpython.git") -> Path:
     """
-    Clone python/cpython (shallow) into target_dir if it doesn't exist or is empty.
+    Clone python/cpython (shallow, .py files only) into target_dir if it doesn't exist or is empty.
     Returns path to repo root (target_dir / "cpython").
     """
     repo_root = target_dir / "cpython"
@@ -216,19 +446,18 @@ def ensure_cpython_repo(target_dir: Path, clone_url: str = "https://github.com/p
     target_dir.mkdir(parents=True, exist_ok=True)
     if repo_root.exists():
         shutil.rmtree(repo_root)
-    subprocess.run(
-        ["git", "clone", "--depth", "1", "--branch", "main", clone_url, str(repo_root)],
-        check=True,
-        capture_output=True,
-    )
+    _clone_py_only(clone_url, repo_root, branch="main")
     return repo_root
 
 
-def run_workflow_cpython(cpython_root: Path) -> dict:
+def run_workflow_cpython(cpython_root: Path, use_file_cache: bool = True) -> dict:
     """
     Run analytics on all .py files under cpython_root. Uses Python 3.12 frozen reference.
+    Per-file counts are cached by content hash, so re-runs after a pull only
+    tokenize files that changed.
     """
-    result = _run_workflow_directory(cpython_root, "python/cpython (full repo)")
+    py_files = list(_iter_py_files(cpython_root))
+    result = _run_workflow_directory(py_files, "python/cpython (full repo)", use_file_cache)
     result["meta"]["cpython_root"] = str(cpython_root)
     return result
 
@@ -238,6 +467,17 @@ DEFAULT_CORPUS_URL = (
     "https://raw.githubusercontent.com/python/cpython/main/Lib/collections/__init__.py"
 )
 
+# Per-file counts cache (content-hash sidecars), used by run_workflow_cpython
+FILE_CACHE_DIR = Path(__file__).resolve().parent / ".analytics_cache" / "files"
+# Mixed into the content hash; bump when counting rules or py312_language change
+FILE_CACHE_SALT = b"py312-v1"
+# Files larger than this are mmap'd instead of read into memory
+MMAP_MIN_BYTES = 64 * 1024
+# .py files larger than this are skipped by directory runs (generated code)
+MAX_FILE_BYTES = 2 * 1024 * 1024
+# Directory runs with fewer files to tokenize than this skip the process pool
+POOL_MIN_FILES = 64
+
 # Where to clone cpython (same directory as this script)
 CPYTHON_CLONE_DIR = Path(__file__).resolve().parent
 
@@ -4,9 +4,13 @@
 import json
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import matplotlib as mpl
 
+mpl.use("Agg")  # file output only; skip GUI backend selection
+
+import matplotlib.pyplot as plt
+import numpy as np
+
 # Style: dark-ish background, readable fonts
 mpl.rcParams["figure.facecolor"] = "#1a1b26"
 mpl.rcParams["axes.facecolor"] = "#24283b"
@@ -19,6 +23,13 @@ mpl.rcParams["text.color"] = "#c0caf5"
 DATA_PATH = Path(__file__).resolve().parent / "keyword_analytics.json"
 TOP_N = 25
 
+# Bar gradients, computed once; bars are drawn ascending, so a chart with
+# n < TOP_N bars takes the last n (darkest bar = most frequent).
+_SHADES = np.linspace(0.3, 0.9, TOP_N, endpoint=False)
+BLUES = plt.cm.Blues(_SHADES)
+GREENS = plt.cm.Greens(_SHADES)
+PURPLES = plt.cm.Purples(_SHADES)
+
 
 def load_data():
     with open(DATA_PATH) as f:
@@ -31,7 +42,7 @@ def main():
     blt = list(data["builtin_freq"].items())[:TOP_N]
     dnd = list(data.get("dunder_freq", {}).items())[:TOP_N]
     ncols = 3 if dnd else 2
-    fig, axes = plt.subplots(1, ncols, figsize=(6 * ncols, 8))
+    fig, axes = plt.subplots(1, ncols, figsize=(6 * ncols, 8), constrained_layout=True)
     if ncols == 2:
         ax1, ax2 = axes
     else:
@@ -44,8 +55,7 @@ def main():
     # Keywords
     labels_kw = [x[0] for x in reversed(kw)]
     vals_kw = [x[1] for x in reversed(kw)]
-    colors_kw = plt.cm.Blues([0.3 + 0.6 * (i / max(len(vals_kw), 1)) for i in range(len(vals_kw))])
-    ax1.barh(labels_kw, vals_kw, color=colors_kw, edgecolor="#565f89", linewidth=0.5)
+    ax1.barh(labels_kw, vals_kw, color=BLUES[TOP_N - len(vals_kw):], edgecolor="#565f89", linewidth=0.5)
     ax1.set_xlabel("Count")
     ax1.set_title("Top keywords")
     ax1.spines["top"].set_visible(False)
@@ -54,8 +64,7 @@ def main():
     # Built-ins
     labels_blt = [x[0] for x in reversed(blt)]
     vals_blt = [x[1] for x in reversed(blt)]
-    colors_blt = plt.cm.Greens([0.3 + 0.6 * (i / max(len(vals_blt), 1)) for i in range(len(vals_blt))])
-    ax2.barh(labels_blt, vals_blt, color=colors_blt, edgecolor="#565f89", linewidth=0.5)
+    ax2.barh(labels_blt, vals_blt, color=GREENS[TOP_N - len(vals_blt):], edgecolor="#565f89", linewidth=0.5)
     ax2.set_xlabel("Count")
     ax2.set_title("Top built-ins")
     ax2.spines["top"].set_visible(False)
@@ -65,14 +74,12 @@ def main():
     if dnd:
         labels_dnd = [x[0] for x in reversed(dnd)]
         vals_dnd = [x[1] for x in reversed(dnd)]
-        colors_dnd = plt.cm.Purples([0.3 + 0.6 * (i / max(len(vals_dnd), 1)) for i in range(len(vals_dnd))])
-        ax3.barh(labels_dnd, vals_dnd, color=colors_dnd, edgecolor="#565f89", linewidth=0.5)
+        ax3.barh(labels_dnd, vals_dnd, color=PURPLES[TOP_N - len(vals_dnd):], edgecolor="#565f89", linewidth=0.5)
         ax3.set_xlabel("Count")
         ax3.set_title("Top dunder methods")
         ax3.spines["top"].set_visible(False)
         ax3.spines["right"].set_visible(False)
 
-    plt.tight_layout()
     out = Path(__file__).resolve().parent / "keyword_analytics_plot.png"
     plt.savefig(out, dpi=150, bbox_inches="tight", facecolor="#1a1b26")
     print(f"Saved {out}")